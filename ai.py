@@ -1,18 +1,218 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import numpy as np
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 
+logger = logging.getLogger(__name__)
+
+
+class OllamaAPIError(Exception):
+    """Ollama answered with a non-200 status (after the session's own retries)."""
+
+
 class OllamaAssistant:
-    def __init__(self, model="gemma3:4b"):
+    def __init__(self, model="gemma3:4b", embed_model="nomic-embed-text"):
         self.model = model
+        self.embed_model = embed_model
+        # Reuse keep-alive connections to the local Ollama server across jobs.
+        # urllib3 retries only failed connects (nothing was sent) and 429/5xx rejections,
+        # with exponential backoff honouring Retry-After. Read errors/timeouts are never
+        # resent: POST generate calls aren't idempotent and a timed-out one may still be running.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=64,
+            max_retries=Retry(
+                total=2,
+                connect=2,
+                read=0,
+                status=2,
+                other=0,
+                backoff_factor=1.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset({"POST"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
-    def submit_message(self, prompt):
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": self.model, "prompt": prompt, "stream": False}
+    def _post(self, endpoint, payload):
+        """POST an orjson-encoded payload to the Ollama API; returns the response."""
+        return self.session.post(
+            f"http://localhost:11434{endpoint}",
+            data=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=(10, 300),
         )
+
+    def submit_message(self, prompt, json_format=False):
+        payload = {"model": self.model, "prompt": prompt, "stream": False}
+        if json_format:
+            # Constrain decoding to valid JSON
+            payload["format"] = "json"
+        response = self._post("/api/generate", payload)
         if response.status_code == 200:
-            print("Ollama API response received.")
-            print("Response:", response.json())
-            return response.json()["response"].strip()
+            body = orjson.loads(response.content)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Ollama response: %s", body)
+            return body["response"].strip()
         else:
-            raise Exception(f"Ollama API Error: {response.text}")
+            raise OllamaAPIError(f"Ollama API Error: {response.text}")
+
+    def submit_chat(self, system, user, json_format=False):
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            "stream": False,
+            "options": {"num_ctx": 4096, "temperature": 0},
+        }
+        if json_format:
+            # Constrain decoding to valid JSON
+            payload["format"] = "json"
+        response = self._post("/api/chat", payload)
+        if response.status_code == 200:
+            body = orjson.loads(response.content)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Ollama response: %s", body)
+            return body["message"]["content"].strip()
+        else:
+            raise OllamaAPIError(f"Ollama API Error: {response.text}")
+
+    def embed(self, texts):
+        """Embed all `texts` in one batched /api/embed request; falls back to one /api/embeddings call per text."""
+        response = self._post("/api/embed", {"model": self.embed_model, "input": texts})
+        if response.status_code == 200:
+            body = orjson.loads(response.content)
+            if "embeddings" in body:
+                return body["embeddings"]
+
+        embeddings = []
+        for text in texts:
+            response = self._post("/api/embeddings", {"model": self.embed_model, "prompt": text})
+            if response.status_code != 200:
+                raise OllamaAPIError(f"Ollama API Error: {response.text}")
+            embeddings.append(orjson.loads(response.content)["embedding"])
+        return embeddings
+
+
+class ResponseCache:
+    """Persistent exact-match cache of model responses, keyed on sha256(model|prompt)."""
+
+    def __init__(self, path="llm_cache.sqlite"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(model, prompt):
+        return hashlib.sha256(f"{model}|{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, response):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)", (key, response))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class EmbedCache:
+    """
+    Near-duplicate cache: reuses a stored verdict when a job's embedding has cosine
+    similarity >= `threshold` with one already evaluated under the same scope
+    (see make_scope / use_scope). Persisted in sqlite.
+    """
+
+    def __init__(self, path="embed_cache.sqlite", model="nomic-embed-text", threshold=0.93):
+        self.path = path
+        self.model = model
+        self.threshold = threshold
+        self.scope = None
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(model TEXT, scope TEXT, embedding BLOB, verdict TEXT, years_required TEXT)"
+        )
+        # Caches written before verdicts were scoped have no scope column; their rows never match
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(embeddings)")}
+        if "scope" not in columns:
+            self.conn.execute("ALTER TABLE embeddings ADD COLUMN scope TEXT")
+        self.conn.commit()
+        self.vectors = []
+        self.entries = []
+        self._matrix = None
+
+    @staticmethod
+    def make_scope(model, system_prompt):
+        """Verdicts are only reusable for the same LLM and system prompt (which includes the resume)."""
+        return hashlib.sha256(f"{model}|{system_prompt}".encode("utf-8")).hexdigest()
+
+    def use_scope(self, scope):
+        """Load the cached verdicts of `scope`; lookups and additions then apply to that scope only."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT embedding, verdict, years_required FROM embeddings WHERE model = ? AND scope = ?",
+                (self.model, scope),
+            ).fetchall()
+            self.scope = scope
+            self.vectors = [np.frombuffer(blob, dtype=np.float32) for blob, _, _ in rows]
+            self.entries = [(verdict, years_required) for _, verdict, years_required in rows]
+            self._matrix = None
+
+    @staticmethod
+    def _normalize(embedding):
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def lookup(self, embedding):
+        """Return (verdict, years_required) of the nearest cached job, or None if nothing is close enough."""
+        vec = self._normalize(embedding)
+        with self.lock:
+            if not self.vectors:
+                return None
+            if self._matrix is None:
+                self._matrix = np.vstack(self.vectors)
+            if self._matrix.shape[1] != vec.shape[0]:
+                return None
+            sims = self._matrix @ vec
+            best = int(np.argmax(sims))
+            if sims[best] >= self.threshold:
+                return self.entries[best]
+        return None
+
+    def add(self, embedding, verdict, years_required):
+        vec = self._normalize(embedding)
+        with self.lock:
+            self.vectors.append(vec)
+            self.entries.append((verdict, years_required))
+            self._matrix = None
+            self.conn.execute(
+                "INSERT INTO embeddings (model, scope, embedding, verdict, years_required) VALUES (?, ?, ?, ?, ?)",
+                (self.model, self.scope, vec.tobytes(), verdict, years_required),
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
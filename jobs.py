@@ -2,15 +2,18 @@ import logging
 import traceback
 import os
 import json
+import orjson
 import re
 from datetime import date
-import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Font
 from openpyxl.utils import get_column_letter
 from tqdm import tqdm
-from ai import OllamaAssistant
+from ai import OllamaAssistant, ResponseCache, EmbedCache
 from jobs_scraper import *
 
 # --------------------------- Config & Constants ---------------------------
@@ -31,17 +34,67 @@ pd.set_option("display.width", None)
 logging.basicConfig(level=logging.INFO)
 
 excel_file = "jobs.xlsx"
+# Canonical job store; jobs.xlsx is regenerated from it as the presentation view
+parquet_file = "jobs.parquet"
+
+# Columns of the scraped jobs DataFrame used when evaluating jobs
+scraped_columns = ["job_url", "title", "description", "company", "date_posted"]
+
+# Descriptions are clipped to this many characters in the prompt (the Excel keeps the full text)
+MAX_DESCRIPTION_CHARS = 1500
+HTML_TAG_RE = re.compile(r"<[^>]*?>", re.DOTALL)
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Model response parsing
+FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)\s*```", re.IGNORECASE)
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+JSON_DECODER = json.JSONDecoder()
+
+# Cheap lexical pre-filter: jobs that clearly fail the FIELD FILTER or EXPERIENCE CHECK
+# below are rejected without a model call. Only specific technical terms count, since
+# generic words like "data", "AI" or "automation" show up in most business postings too.
+MAX_YEARS_REQUIRED = 4
+# Larger numbers are company history ("over 25 years of experience"), not a requirement
+MAX_PLAUSIBLE_YEARS = 15
+TECH_VOCAB_RE = re.compile(
+    r"(?<!\w)(software|developers?|programm(?:er|ing)|python|java|javascript|typescript|react|angular|"
+    r"vue(?:\.js)?|node\.js|golang|c\+\+|c#|\.net|sql|kubernetes|docker|terraform|aws|azure|gcp|devops|"
+    r"linux|backend|back-end|frontend|front-end|full[\s-]?stack|machine learning|"
+    r"data (?:engineer|engineering|scientist|science|analyst)|cyber\s?security|information technology)(?!\w)",
+    re.IGNORECASE,
+)
+NON_TECH_TITLE_RE = re.compile(
+    r"\b(sales|marketing|hr|human resources|recruit(?:er|ing)|finance|accountant|accounting|"
+    r"bookkeeper|cashier|customer service)\b",
+    re.IGNORECASE,
+)
+# Matches "5 years", "5+ years", "3-5 years", "3 to 5 yrs" followed by "experience";
+# group 1 is the lower bound, group 2 the "+" of an "N+ years" form
+YEARS_RE = re.compile(
+    r"\b(\d{1,2})\s*(\+)?\s*(?:(?:-|–|to)\s*\d{1,2}\s*\+?\s*)?(?:years?|yrs?)\b"
+    r"(?:\s+of)?(?:\s+[\w/+#.-]+){0,3}?\s+(?:experience|exp)\b",
+    re.IGNORECASE,
+)
+# Mentions offered as alternatives ("3+ years or 8 years") or as optional don't count
+ALTERNATIVE_BEFORE_RE = re.compile(r"\bor\s*$", re.IGNORECASE)
+ALTERNATIVE_RE = re.compile(r"\bor\b", re.IGNORECASE)
+ALTERNATIVE_AFTER_RE = re.compile(r"\s*(?:,\s*)?or\b", re.IGNORECASE)
+OPTIONAL_RE = re.compile(
+    r"[^.\n]{0,30}?\b(preferred|preferably|nice to have|(?:is )?a plus|bonus|desired|desirable|ideally)\b",
+    re.IGNORECASE,
+)
+# A years mention only counts as a requirement when one of these phrases shortly precedes it
+REQUIREMENT_RE = re.compile(
+    r"\b(minimum|min\.?|at least|requires?|required|requirements?|must have|you have|you bring)\b[^.\n]{0,40}$",
+    re.IGNORECASE,
+)
 
 PERSONAL_JOB_FINDER_PROMPT = """
 You are my Personal IT Job Finder & Evaluator.
 
 INPUTS
-- JOB:
-  - title: {title}
-  - description: {description}
-
-- RESUME:
-{resume_text}
+- JOB: the user message, a JSON object with the job's "title" and "description".
+- RESUME: given at the end of this message.
 
 GOAL
 Evaluate whether I should apply to this job by analyzing both the job description and my resume.
@@ -113,52 +166,157 @@ def load_resume_text(path: str) -> str:
         return ""
 
 
-def format_prompt(template: str, **kwargs) -> str:
-    """Safely substitute placeholders while keeping other braces literal.
+def build_system_prompt(resume_text: str) -> str:
+    """
+    System message shared by every job: instructions followed by the resume.
+    It is identical for the whole run, so Ollama can reuse its KV cache for it.
+    """
+    divider = "-" * 53
+    return f"{PERSONAL_JOB_FINDER_PROMPT}\n{divider}\nRESUME\n{divider}\n{resume_text}\n"
+
+
+def clean_description(description, limit: int = MAX_DESCRIPTION_CHARS) -> str:
+    """Strip HTML tags, collapse whitespace and clip to `limit` characters to keep prompts short."""
+    if description is None or (isinstance(description, float) and pd.isna(description)):
+        return ""
+    text = HTML_TAG_RE.sub(" ", str(description))
+    text = WHITESPACE_RE.sub(" ", text).strip()
+    return text[:limit]
+
 
-    Escapes all braces first, then reinstates placeholders like {title}, {description}, {resume_text}.
+def required_years(description: str):
+    """
+    Years of experience the description explicitly requires, or None if it doesn't say.
+
+    A mention only counts when requirement wording ("minimum", "at least", "requires", ...)
+    shortly precedes it. Mentions offered as one of several alternatives ("3+ years or 8 years")
+    or marked as optional ("preferred", "nice to have", ...) are ignored, and if several
+    mentions remain the smallest is used, so an uncertain case is left to the model.
+
+    >>> required_years("Requires 5+ years of professional experience in Java")
+    5
+    >>> required_years("Our company has 10+ years of experience serving clients.") is None
+    True
+    >>> required_years("Founded with over 25 years of experience in retail, we hire juniors") is None
+    True
+    >>> required_years("Requires a degree and 3+ years or 8 years of relevant experience") is None
+    True
+    >>> required_years("Requirements: 5+ years of Python experience preferred") is None
+    True
+    >>> required_years("Requirements: 5+ years preferred experience in Go") is None
+    True
+    >>> required_years("At least 6 years of backend experience and 2+ years of AWS experience required")
+    2
     """
-    escaped = template.replace("{", "{{").replace("}", "}}")
-    for k, v in kwargs.items():
-        escaped = escaped.replace(f"{{{{{k}}}}}", str(v))
-    return escaped
+    years = []
+    for m in YEARS_RE.finditer(description):
+        value = int(m.group(1))
+        if value > MAX_PLAUSIBLE_YEARS:
+            continue
+        before = description[max(0, m.start() - 60):m.start()]
+        after = description[m.end():m.end() + 40]
+        if not REQUIREMENT_RE.search(before):
+            continue
+        if ALTERNATIVE_BEFORE_RE.search(before) or ALTERNATIVE_RE.search(m.group(0)) or ALTERNATIVE_AFTER_RE.match(after):
+            continue
+        if OPTIONAL_RE.search(m.group(0)) or OPTIONAL_RE.match(after):
+            continue
+        years.append(value)
+    return min(years) if years else None
+
+
+def prefilter_job(title, description):
+    """
+    Decide obvious rejections without the model.
+    Returns (verdict, years_required, reason) when the job can be rejected outright, otherwise None.
+    years_required stays a plain number or "unspecified"; the reason is logged per job instead.
+    """
+    title = "" if title is None or pd.isna(title) else str(title)
+    description = "" if description is None or pd.isna(description) else str(description)
+
+    if NON_TECH_TITLE_RE.search(title) and not TECH_VOCAB_RE.search(f"{title}\n{description}"):
+        return "no", "unspecified", "non-technical title"
+
+    years = required_years(description)
+    if years is not None and years > MAX_YEARS_REQUIRED:
+        return "no", str(years), f"requires {years} years"
+
+    return None
 
 
 def load_df():
-    if os.path.exists(excel_file):
+    """
+    Load previously stored jobs. The Parquet store is the fast path; the Excel file is
+    only read when no Parquet store exists yet (e.g. the first run after upgrading).
+    """
+    if os.path.exists(parquet_file):
+        df = pd.read_parquet(parquet_file)
+    elif os.path.exists(excel_file):
         df = pd.read_excel(excel_file, engine="openpyxl")
-        # Ensure required columns exist; backfill missing ones instead of erroring
-        for col in required_columns:
-            if col not in df.columns:
-                # Use sensible defaults for missing historical columns
-                if col in ("keywords_required", "keywords_missing"):
-                    df[col] = ""
-                else:
-                    df[col] = ""
-        return df
     else:
         return pd.DataFrame(columns=required_columns)
 
+    # Ensure required columns exist; backfill missing ones instead of erroring
+    for col in required_columns:
+        if col not in df.columns:
+            # Use sensible defaults for missing historical columns
+            df[col] = ""
+    return df
+
+
+def save_df(df: pd.DataFrame, path: str = None):
+    """
+    Persist the canonical job store as Parquet. `posted_date` is stored as a datetime
+    (so jobs.xlsx keeps real date cells); the remaining object columns are stored as text.
+    """
+    target_path = path or parquet_file
+    df = df.copy()
+    if "posted_date" in df.columns:
+        df["posted_date"] = pd.to_datetime(df["posted_date"], errors="coerce", format="mixed")
+    text_cols = {col: "string" for col in df.columns if col != "posted_date" and df[col].dtype == object}
+    df.astype(text_cols).to_parquet(target_path, index=False)
+
+
+def load_seen_urls() -> set:
+    """
+    URLs of already-stored jobs. Reads only the `link` column of the Parquet store,
+    so startup stays fast regardless of history size.
+    """
+    if os.path.exists(parquet_file):
+        links = pd.read_parquet(parquet_file, columns=["link"])["link"]
+    else:
+        links = load_df()["link"]
+    return set(links.dropna())
+
 
 def parse_json_response(response_text: str):
     """
     Robust JSON extraction:
     - Accept raw JSON or fenced ```json blocks
-    - Remove trailing commas before closing } or ]
+    - Ignore any text before the first { or after the JSON object
+    - Remove trailing commas before closing } or ] if the first attempt fails
     """
     try:
         txt = response_text.strip()
 
         # If fenced, extract the inside
         if txt.startswith("```"):
-            m = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", txt, re.IGNORECASE)
+            m = FENCE_RE.search(txt)
             if m:
                 txt = m.group(1).strip()
 
-        # Remove trailing commas like {...,} or [...,]
-        txt = re.sub(r",\s*([}\]])", r"\1", txt)
-
-        parsed = json.loads(txt)
+        start = txt.find("{")
+        if start < 0:
+            raise ValueError("No JSON object found in model response")
+        try:
+            # Common case: the response is exactly one JSON object
+            parsed = orjson.loads(txt[start:])
+        except orjson.JSONDecodeError:
+            try:
+                parsed, _ = JSON_DECODER.raw_decode(txt, start)
+            except json.JSONDecodeError:
+                # Remove trailing commas like {...,} or [...,]
+                parsed, _ = JSON_DECODER.raw_decode(TRAILING_COMMA_RE.sub(r"\1", txt[start:]))
 
         verdict = str(parsed.get("verdict", "")).lower().strip()
         years_required = str(parsed.get("years_required", "unspecified")).strip()
@@ -173,6 +331,18 @@ def parse_json_response(response_text: str):
         raise e
 
 
+@lru_cache(maxsize=1024)
+def keyword_pattern(keyword: str):
+    """
+    Compile one regex matching any alternate of `keyword` as a whole word.
+    Alternates are split on slashes, commas or " or ", e.g. "React/Next.js".
+    """
+    alts = [a.strip() for a in re.split(r"[\/,]| or ", keyword.lower()) if a.strip()]
+    if not alts:
+        return None
+    return re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, alts)) + r")(?!\w)")
+
+
 def quick_keyword_hit_rate(keywords_required, resume_text: str) -> str:
     """
     Very lightweight coverage metric: % of required keywords that appear in resume (case-insensitive).
@@ -180,65 +350,67 @@ def quick_keyword_hit_rate(keywords_required, resume_text: str) -> str:
     if not keywords_required:
         return "0% (0/0)"
     rlow = resume_text.lower()
-    hits = 0
-    for kw in keywords_required:
-        # Split on slashes or commas to allow simple alternates like "React/Next.js"
-        alts = re.split(r"[\/,]| or ", kw.lower())
-        alts = [a.strip() for a in alts if a.strip()]
-        if any(a in rlow for a in alts):
-            hits += 1
+    patterns = [keyword_pattern(kw) for kw in keywords_required]
+    hits = sum(1 for p in patterns if p is not None and p.search(rlow))
     pct = int(round(100.0 * hits / len(keywords_required)))
     return f"{pct}% ({hits}/{len(keywords_required)})"
 
 
-def beautify_excel(path: str = None):
-    target_path = path or excel_file
-    wb = load_workbook(target_path)
-    ws = wb.active
-
-    # Header styling
-    if ws.max_row >= 1:
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-
-    # Auto filter
-    ws.auto_filter.ref = ws.dimensions
-
-    # Color fills for recommendations
-    red_fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
-    green_fill = PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
-    yellow_fill = PatternFill(start_color="FFFFCC", end_color="FFFFCC", fill_type="solid")
-
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-        for cell in row:
-            # Column A = AI_recommendation
-            if cell.column_letter == "A":
-                if str(cell.value).lower() == "no":
-                    cell.fill = red_fill
-                elif str(cell.value).lower() in {"yes", "maybe+"}:
-                    cell.fill = green_fill
-                elif str(cell.value).lower() not in {"yes", "no"}:
-                    cell.fill = yellow_fill
-            # Column D = link (hyperlink)
-            if cell.column_letter == "D" and cell.value:
-                cell.hyperlink = cell.value
-                cell.style = "Hyperlink"
-
-    # Approximate auto-size columns
-    for col_idx in range(1, ws.max_column + 1):
-        col_letter = get_column_letter(col_idx)
-        max_len = 0
-        for cell in ws[col_letter]:
-            try:
-                val = str(cell.value) if cell.value is not None else ""
-            except Exception:
-                val = ""
-            if len(val) > max_len:
-                max_len = len(val)
-        # clamp width to reasonable range
-        ws.column_dimensions[col_letter].width = max(10, min(60, max_len + 2))
+RED_FILL = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
+GREEN_FILL = PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
+YELLOW_FILL = PatternFill(start_color="FFFFCC", end_color="FFFFCC", fill_type="solid")
 
-    wb.save(target_path)
+
+def recommendation_fill(value):
+    verdict = str(value).lower()
+    if verdict == "no":
+        return RED_FILL
+    if verdict in {"yes", "maybe+"}:
+        return GREEN_FILL
+    return YELLOW_FILL
+
+
+def write_styled_workbook(df: pd.DataFrame, path: str):
+    """
+    Stream `df` into a styled workbook in a single pass (openpyxl write-only mode):
+    bold header, auto filter, recommendation colors, hyperlinked links and approximate column widths.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("jobs")
+    columns = list(df.columns)
+
+    # Write-only sheets need column widths before any row is appended
+    for col_idx, col in enumerate(columns, start=1):
+        lengths = df[col].dropna().astype(str).str.len()
+        max_len = max(len(str(col)), int(lengths.max()) if len(lengths) else 0)
+        # clamp width to reasonable range
+        ws.column_dimensions[get_column_letter(col_idx)].width = max(10, min(60, max_len + 2))
+
+    ws.auto_filter.ref = f"A1:{get_column_letter(max(1, len(columns)))}{len(df) + 1}"
+
+    header = []
+    for col in columns:
+        cell = WriteOnlyCell(ws, value=col)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
+
+    rec_idx = columns.index("AI_recommendation") if "AI_recommendation" in columns else -1
+    link_idx = columns.index("link") if "link" in columns else -1
+    for values in df.itertuples(index=False, name=None):
+        row = [None if pd.api.types.is_scalar(v) and pd.isna(v) else v for v in values]
+        if rec_idx >= 0:
+            cell = WriteOnlyCell(ws, value=row[rec_idx])
+            cell.fill = recommendation_fill(row[rec_idx])
+            row[rec_idx] = cell
+        if link_idx >= 0 and row[link_idx]:
+            cell = WriteOnlyCell(ws, value=row[link_idx])
+            cell.hyperlink = row[link_idx]
+            cell.style = "Hyperlink"
+            row[link_idx] = cell
+        ws.append(row)
+
+    wb.save(path)
 
 
 def write_excel_safely(df: pd.DataFrame, path: str) -> str:
@@ -248,8 +420,7 @@ def write_excel_safely(df: pd.DataFrame, path: str) -> str:
     write to a timestamped fallback file next to it and return that path.
     """
     try:
-        df.to_excel(path, index=False, engine="openpyxl")
-        beautify_excel(path)
+        write_styled_workbook(df, path)
         return path
     except PermissionError:
         base, ext = os.path.splitext(path)
@@ -259,92 +430,169 @@ def write_excel_safely(df: pd.DataFrame, path: str) -> str:
             path,
             fallback,
         )
-        df.to_excel(fallback, index=False, engine="openpyxl")
-        beautify_excel(fallback)
+        write_styled_workbook(df, fallback)
         return fallback
 
 
-def send_with_retries(assistant, msg: str, tries: int = 3, backoff_sec: float = 1.5):
+def send_with_retries(assistant, msg: str, tries: int = 2, cache=None, validate=None, system: str = None):
+    """
+    Send `msg` to the model, asking again when the answer is invalid.
+    With `system`, `msg` is sent as the user message of a chat next to that system message.
+    If a ResponseCache is given, identical prompts are answered from it instead of the model.
+    `validate` is called on each fresh response; if it raises, the answer is discarded and the
+    model is asked again (up to `tries` answers in total), so unparsable answers are never cached.
+    Since decoding is greedy, repeating the identical request would mostly return the same text,
+    so retries switch Ollama to JSON mode. A bad answer isn't a sign of overload, so there is no backoff.
+    HTTP failures are not retried here: the assistant's session already retried the transient
+    ones, so they are raised immediately instead of multiplying the two retry budgets.
+    """
+    key = None
+    if cache is not None:
+        key = cache.make_key(assistant.model, msg if system is None else f"{system}\n{msg}")
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
     last_err = None
     for attempt in range(1, tries + 1):
+        json_format = attempt > 1
+        if system is None:
+            response = assistant.submit_message(msg, json_format=json_format)
+        else:
+            response = assistant.submit_chat(system, msg, json_format=json_format)
         try:
-            return assistant.submit_message(msg)
+            if validate is not None:
+                validate(response)
         except Exception as e:
             last_err = e
-            logging.warning("Model call failed (attempt %d/%d): %s", attempt, tries, e)
-            time.sleep(backoff_sec * attempt)
+            logging.warning("Invalid model answer (attempt %d/%d): %s", attempt, tries, e)
+            continue
+        if cache is not None:
+            cache.set(key, response)
+        return response
     raise last_err
 
 
 # --------------------------- Core Flow ---------------------------
 
-def scrape_and_filter_ai(unique_urls, assistant, instructions, resume_text):
-    offset = 0
-    new_data = [0]
-    df = pd.DataFrame(columns=required_columns)
-
-    while len(new_data) > 0:
-        try:
-            logging.info(f"Offset of scraping is: {offset}")
-            new_data = scrape_all_jobs(
-                os.getenv("sites"),
-                os.getenv("search_term"),
-                os.getenv("location"),
-                os.getenv("hours_old"),
-                os.getenv("results_wanted"),
-                offset,
-            )
-            logging.info(f"{len(new_data)} jobs scraped ")
-        except Exception as e:
-            logging.error("An error occurred while scraping: %s", e)
-            logging.error("Stack trace: %s", traceback.format_exc())
-            new_data = pd.DataFrame(columns=required_columns)
+def job_row(row, verdict, years_required):
+    return {
+        "AI_recommendation": verdict,
+        "company": row.company,
+        "title": row.title,
+        "link": row.job_url,
+        "years_required": years_required,
+        "description": row.description,
+        "posted_date": row.date_posted,
+    }
+
+
+def evaluate_job(assistant, row, system_prompt, cache=None, embed_cache=None, embedding=None):
+    """Run a single job through the model and return the row to store. Safe to call from worker threads."""
+    # Reuse the verdict of a near-duplicate posting if one was already evaluated
+    if embed_cache is not None and embedding is not None:
+        hit = embed_cache.lookup(embedding)
+        if hit is not None:
+            return job_row(row, *hit)
+
+    msg = orjson.dumps(
+        {
+            "title": "" if pd.isna(row.title) else str(row.title),
+            "description": clean_description(row.description),
+        }
+    ).decode("utf-8")
+
+    ai_response = send_with_retries(assistant, msg, tries=2, cache=cache,
+                                    validate=parse_json_response, system=system_prompt)
+
+    verdict, explanation, years_required = parse_json_response(ai_response)
+
+    if embed_cache is not None and embedding is not None:
+        embed_cache.add(embedding, verdict, years_required)
+
+    return job_row(row, verdict, years_required)
+
+
+def scrape_and_filter_ai(unique_urls, assistant, instructions, resume_text, cache=None, embed_cache=None):
+    rows = []
+    # Number of prompts in flight at once; keep in sync with the server's OLLAMA_NUM_PARALLEL
+    num_parallel = max(1, int(os.getenv("OLLAMA_NUM_PARALLEL", "8")))
+    system_prompt = build_system_prompt(resume_text)
+    if embed_cache is not None:
+        embed_cache.use_scope(embed_cache.make_scope(assistant.model, system_prompt))
+    page_size = max(1, int(os.getenv("page_size", "100")))
 
-        for index, row in tqdm(new_data.iterrows(), total=len(new_data), desc="Analyzing Jobs"):
+    try:
+        # Pages of `page_size` results are fetched concurrently, up to `results_wanted` per site
+        new_data = scrape_all_jobs_paginated(
+            os.getenv("sites"),
+            os.getenv("search_term"),
+            os.getenv("location"),
+            os.getenv("hours_old"),
+            os.getenv("results_wanted"),
+            page_size=page_size,
+            max_workers=int(os.getenv("scrape_workers", "4")),
+            pages_in_flight=int(os.getenv("pages_in_flight", "2")),
+        )
+        logging.info(f"{len(new_data)} jobs scraped ")
+    except Exception as e:
+        logging.error("An error occurred while scraping: %s", e)
+        logging.error("Stack trace: %s", traceback.format_exc())
+        new_data = pd.DataFrame(columns=required_columns)
+
+    # Drop jobs already stored (or repeated across pages/sites) before evaluating anything
+    if len(new_data) > 0:
+        new_data = (
+            new_data.loc[~new_data["job_url"].isin(unique_urls)]
+            .drop_duplicates(subset="job_url")
+            .reset_index(drop=True)
+        )
+        unique_urls.update(new_data["job_url"])
+        logging.info(f"{len(new_data)} new jobs after removing already seen URLs")
+
+    pending = []
+    jobs = new_data.reindex(columns=scraped_columns).itertuples(index=False, name="Job")
+    for row in jobs:
+        decided = prefilter_job(row.title, row.description)
+        if decided is not None:
+            verdict, years_required, reason = decided
+            logging.info("Pre-filter rejected %s (%s): %s", row.job_url, row.title, reason)
+            rows.append(job_row(row, verdict, years_required))
+            continue
+        pending.append(row)
+
+    logging.info("%d jobs rejected by the pre-filter; %d sent to the model", len(new_data) - len(pending), len(pending))
+
+    # Embed new jobs for the near-duplicate cache, one batched request per page of `page_size` jobs
+    embeddings = [None] * len(pending)
+    if embed_cache is not None:
+        for start in range(0, len(pending), page_size):
+            batch = pending[start:start + page_size]
             try:
-                job_url = row.get("job_url", "")
-                if job_url in unique_urls:
-                    continue
-
-                msg = format_prompt(
-                    PERSONAL_JOB_FINDER_PROMPT,
-                    title=row.get("title", ""),
-                    description=row.get("description", ""),
-                    resume_text=resume_text,
+                embeddings[start:start + len(batch)] = assistant.embed(
+                    [f"{row.title}\n{clean_description(row.description)}" for row in batch]
                 )
-
-                ai_response = send_with_retries(assistant, msg, tries=3, backoff_sec=1.5)
-                logging.info("Ollama response received.")
-
-                verdict, explanation, years_required = parse_json_response(ai_response)
-
-                new_row = {
-                    "AI_recommendation": verdict,
-                    "company": row.get("company", ""),
-                    "title": row.get("title", ""),
-                    "link": job_url,
-                    "years_required": years_required,
-                    "description": row.get("description", ""),
-                    "posted_date": row.get("date_posted", ""),
-                }
-                df.loc[len(df)] = new_row
-                unique_urls.add(job_url)
-
+            except Exception as e:
+                logging.warning("Embedding failed; evaluating these %d jobs with the model: %s", len(batch), e)
+
+    with ThreadPoolExecutor(max_workers=num_parallel) as pool:
+        futures = [
+            pool.submit(evaluate_job, assistant, row, system_prompt, cache, embed_cache, embedding)
+            for row, embedding in zip(pending, embeddings)
+        ]
+        for future in tqdm(futures, total=len(futures), desc="Analyzing Jobs"):
+            try:
+                rows.append(future.result())
             except Exception as e:
                 logging.error("An error occurred while sending to AI: %s", e)
                 logging.error("Stack trace: %s", traceback.format_exc())
 
-        offset += len(new_data)
-        # Break after first page if your scraper returns everything at once; remove this to paginate fully
-        break
-
-    return df
+    return pd.DataFrame(rows, columns=required_columns)
 
 
 def main():
     load_env_file(".env")
-    data = load_df()
-    unique_urls = set(data["link"])
+    unique_urls = load_seen_urls()
     # You can still keep instructions.txt if you use it elsewhere, but the prompt is now internal
     try:
         with open("instructions.txt", "r", encoding="utf-8") as file:
@@ -355,11 +603,27 @@ def main():
     resume_text = load_resume_text(os.getenv("RESUME_PATH", "instructions.txt"))
 
     # Better default model for balanced reasoning on 4GB VRAM (with CPU spill if needed)
-    assistant = OllamaAssistant(model=os.getenv("model", "gemma3:4b"))
+    embed_model = os.getenv("embed_model", "")
+    assistant = OllamaAssistant(model=os.getenv("model", "gemma3:4b"), embed_model=embed_model)
     logging.info(f"Ollama Assistant ready using model: {assistant.model}")
 
-    new_df = scrape_and_filter_ai(unique_urls, assistant, instructions, resume_text)
-    df = pd.concat([data, new_df], ignore_index=True)
+    cache = ResponseCache(os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite"))
+    # The semantic cache is opt-in: it needs an embedding model pulled into Ollama
+    embed_cache = None
+    if embed_model:
+        embed_cache = EmbedCache(
+            os.getenv("EMBED_CACHE_PATH", "embed_cache.sqlite"),
+            model=embed_model,
+            threshold=float(os.getenv("EMBED_CACHE_THRESHOLD", "0.93")),
+        )
+    try:
+        new_df = scrape_and_filter_ai(unique_urls, assistant, instructions, resume_text, cache, embed_cache)
+    finally:
+        cache.close()
+        if embed_cache is not None:
+            embed_cache.close()
+    df = pd.concat([load_df(), new_df], ignore_index=True)
+    save_df(df)
     written_path = write_excel_safely(df, excel_file)
     logging.info(f"Excel written to: {written_path}")
 
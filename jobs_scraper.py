@@ -1,5 +1,10 @@
 # jobs_scraper.py
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import pandas as pd
 from jobspy import scrape_jobs
 try:
     # Newer jobspy exposes Site enum here; if not, this import may fail (we handle below)
@@ -7,15 +12,29 @@ try:
 except Exception:
     Site = None  # fallback when enum isn't exposed
 
+# Enum member names supported by the installed jobspy, or None when the enum isn't exposed
+_SUPPORTED = frozenset(m.name.lower() for m in Site) if Site is not None else None
+
+
 def _normalize_sites(site_name):
     """
     Accepts comma-delimited string or list, returns list of valid site names
     for the installed jobspy version. Unknown sites are dropped with a warning.
     """
+    if isinstance(site_name, (list, tuple)):
+        site_name = tuple(str(s) for s in site_name)
+    elif not isinstance(site_name, str):
+        site_name = None
+    return list(_normalize_sites_cached(site_name))
+
+
+@lru_cache(maxsize=8)
+def _normalize_sites_cached(site_name):
+    # Cached per raw value, so the parsing (and any warnings) happen once per run
     if isinstance(site_name, str):
         raw = [s.strip() for s in site_name.split(",") if s.strip()]
-    elif isinstance(site_name, list):
-        raw = [str(s).strip() for s in site_name if str(s).strip()]
+    elif isinstance(site_name, tuple):
+        raw = [s.strip() for s in site_name if s.strip()]
     else:
         raw = []
 
@@ -24,13 +43,12 @@ def _normalize_sites(site_name):
         raw = ["indeed", "linkedin", "zip_recruiter", "glassdoor", "naukri", "bayt", "bdjobs"]  # omit 'google' by default
 
     # If enum available, filter by it; otherwise return raw (best effort)
-    if Site is not None:
-        supported = {m.name.lower() for m in Site}  # enum member names
+    if _SUPPORTED is not None:
         valid = []
         dropped = []
         for s in raw:
             s_up = s.replace("-", "_").lower()
-            if s_up in supported:
+            if s_up in _SUPPORTED:
                 valid.append(s_up)
             else:
                 dropped.append(s)
@@ -39,13 +57,13 @@ def _normalize_sites(site_name):
         if not valid:
             logging.warning("No valid sites left; falling back to ['indeed','linkedin','zip_recruiter']")
             valid = ["indeed", "linkedin", "zip_recruiter"]
-        return valid
+        return tuple(valid)
     else:
         # No enum available; best effort (and avoid 'google' which is known to break on some versions)
         if "google" in raw:
             logging.warning("Dropping 'google' (not supported on this jobspy version).")
             raw = [s for s in raw if s.lower() != "google"]
-        return raw
+        return tuple(raw)
 
 def scrape_all_jobs(site_name, search_term, location, hours_old, results_wanted, offset=0,
                     google_search_term=None, country_indeed="India"):
@@ -65,3 +83,78 @@ def scrape_all_jobs(site_name, search_term, location, hours_old, results_wanted,
         linkedin_fetch_description=True,
         # proxies=[...]
     )
+
+
+class _RateLimiter:
+    """Lets callers through at most once every `min_interval` seconds (thread-safe)."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def scrape_all_jobs_paginated(site_name, search_term, location, hours_old, results_wanted, page_size=100,
+                              max_workers=4, pages_in_flight=2, min_interval=1.0, google_search_term=None,
+                              country_indeed="India"):
+    """
+    Fetch up to `results_wanted` jobs per site as pages of `page_size`.
+    Pages are requested in waves: up to `pages_in_flight` consecutive pages for every site
+    that still has results, all fetched concurrently (bounded by `max_workers`). A site stops
+    as soon as a page comes back short, fails, or adds no job URL that site hasn't returned
+    already (e.g. a scraper that ignores the offset). A per-site rate limiter spaces out
+    requests to the same site by `min_interval` seconds.
+    """
+    site_list = _normalize_sites(site_name)
+    total = int(results_wanted) if results_wanted else 50
+    page_size = max(1, int(page_size))
+    pages_in_flight = max(1, int(pages_in_flight))
+    limiters = {site: _RateLimiter(min_interval) for site in site_list}
+
+    def fetch(page):
+        site, offset = page
+        limiters[site].wait()
+        try:
+            return scrape_all_jobs([site], search_term, location, hours_old, min(page_size, total - offset), offset,
+                                   google_search_term=google_search_term, country_indeed=country_indeed)
+        except Exception as e:
+            logging.warning("Scraping %s at offset %d failed: %s", site, offset, e)
+            return None
+
+    results = []
+    seen = {site: set() for site in site_list}
+    next_offsets = {site: 0 for site in site_list}
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        while next_offsets:
+            wave = [
+                (site, offset + k * page_size)
+                for site, offset in next_offsets.items()
+                for k in range(pages_in_flight)
+                if offset + k * page_size < total
+            ]
+            for (site, offset), df in zip(wave, pool.map(fetch, wave)):
+                if site not in next_offsets:
+                    # The site already stopped at an earlier page of this wave
+                    continue
+                rows = 0 if df is None else len(df)
+                new = df.loc[~df["job_url"].isin(seen[site])] if rows else None
+                if new is not None and len(new) > 0:
+                    results.append(new)
+                    seen[site].update(new["job_url"])
+                offset += page_size
+                if rows < page_size or new is None or len(new) == 0 or offset >= total:
+                    del next_offsets[site]
+                else:
+                    next_offsets[site] = offset
+
+    if not results:
+        return pd.DataFrame()
+    return pd.concat(results, ignore_index=True).drop_duplicates(subset="job_url").reset_index(drop=True)